@@ -3,36 +3,132 @@ BMP Steganography - Functional Programming Approach
 Completely different structure using functions instead of classes
 """
 
+import mmap
 import os
+import struct
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 # Global constants
-DELIMITER = "###END###"
+LENGTH_PREFIX_FORMAT = '<I'  # message length in bytes, stored before it
+LENGTH_PREFIX_SIZE = struct.calcsize(LENGTH_PREFIX_FORMAT)
 BITS_PER_BYTE = 8
 
+# Work is only split across processes for large images; below this many
+# channel bytes the cost of sending data to workers outweighs the gain
+PARALLEL_THRESHOLD = 64 * 1024 * 1024
+CHUNK_SIZE = 4 * 1024 * 1024  # channel bytes per task, a multiple of 8
+
+# Kernels walk their input in tiles small enough to stay in L2 cache;
+# used when the L2 size cannot be queried
+DEFAULT_TILE_SIZE = 64 * 1024
+
+# 14-byte file header + 40-byte BITMAPINFOHEADER; the format covers the
+# fields we use: signature, file size, reserved x2, data offset,
+# DIB header size, width, height, planes, bits per pixel
+BMP_HEADER_SIZE = 54
+BMP_HEADER_FORMAT = '<2sIHHIIiiHH'
+
+# Lookup tables for working on whole byte buffers at once
+DIGIT_TO_BIT = bytes.maketrans(b'01', b'\x00\x01')
+CLEAR_LSB = bytes(value & 0xFE for value in range(256))
+LSB_TO_DIGIT = bytes(ord('0') + (value & 1) for value in range(256))
+
 # ============================================================================
 # UTILITY FUNCTIONS
 # ============================================================================
 
-def string_to_binary(text):
-    """Convert string to binary string"""
-    binary_str = ''.join(format(ord(char), '08b') for char in text)
-    return binary_str
+def bytes_to_bits(data):
+    """Convert bytes to one 0/1 byte per bit, most significant bit first"""
+    if not data:
+        return b''
+    
+    # Format the whole buffer as one big integer in base 2, rather than
+    # building an 8-character string per byte
+    bit_count = len(data) * BITS_PER_BYTE
+    digits = format(int.from_bytes(data, 'big'), f'0{bit_count}b')
+    return digits.encode('ascii').translate(DIGIT_TO_BIT)
+
+
+def bits_to_bytes(bits):
+    """Pack the LSB of every byte in bits back into bytes"""
+    # Only whole bytes can be rebuilt
+    bit_count = len(bits) - len(bits) % BITS_PER_BYTE
+    
+    # Turn every LSB into a '0'/'1' digit and parse them as one base-2
+    # number, which packs the bits without a Python-level loop
+    tile_size = get_tile_size()
+    packed = bytearray(bit_count // BITS_PER_BYTE)  # Output size is known
+    for start in range(0, bit_count, tile_size):
+        end = min(start + tile_size, bit_count)
+        digits = bits[start:end].translate(LSB_TO_DIGIT)
+        packed[start // BITS_PER_BYTE:end // BITS_PER_BYTE] = \
+            int(digits, 2).to_bytes((end - start) // BITS_PER_BYTE, 'big')
+    return packed
+
+
+def get_tile_size():
+    """Get the number of channel bytes a kernel should handle at a time"""
+    try:
+        l2_size = os.sysconf('SC_LEVEL2_CACHE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        l2_size = 0  # Not available on this platform
+    
+    if l2_size <= 0:
+        return DEFAULT_TILE_SIZE
+    
+    # A tile is held about four times over (slice, translated copy and the
+    # big integers), so keep one tile to an eighth of L2
+    tile_size = l2_size // 8
+    return max(BITS_PER_BYTE, tile_size - tile_size % BITS_PER_BYTE)
+
+
+def embed_bits(channels, bits):
+    """Write 0/1 bit bytes into the LSBs of an equal-length run of channels"""
+    tile_size = get_tile_size()
+    result = bytearray(len(channels))
+    
+    for start in range(0, len(channels), tile_size):
+        tile = channels[start:start + tile_size]
+        tile_bits = bits[start:start + tile_size]
+        
+        # Clear the LSBs, then OR the message bits in. Both buffers are
+        # treated as one big integer so the work runs in C.
+        cleared = int.from_bytes(tile.translate(CLEAR_LSB), 'big')
+        merged = cleared | int.from_bytes(tile_bits, 'big')
+        result[start:start + len(tile)] = merged.to_bytes(len(tile), 'big')
+    
+    return result
 
 
-def binary_to_string(binary_str):
-    """Convert binary string to text"""
-    chars = []
-    for i in range(0, len(binary_str), BITS_PER_BYTE):
-        byte = binary_str[i:i+BITS_PER_BYTE]
-        if len(byte) == BITS_PER_BYTE:
-            chars.append(chr(int(byte, 2)))
-    return ''.join(chars)
+def get_worker_count(size, n_workers=None):
+    """Decide how many processes to use for size channel bytes (1 = serial)"""
+    if size < PARALLEL_THRESHOLD:
+        return 1
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    return max(1, n_workers)
 
 
-def read_int(file, bytes_count, signed=False):
-    """Read integer from file"""
-    return int.from_bytes(file.read(bytes_count), byteorder='little', signed=signed)
+def map_chunks(function, workers, *buffers):
+    """
+    Call function on matching CHUNK_SIZE slices of buffers in worker processes
+    Returns: list of results in chunk order
+    """
+    starts = range(0, len(buffers[0]), CHUNK_SIZE)
+    chunks = [[buffer[start:start + CHUNK_SIZE] for start in starts]
+              for buffer in buffers]
+    
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Progress indicator, updated once per finished chunk
+        for result in executor.map(function, *chunks):
+            results.append(result)
+            progress = (len(results) / len(starts)) * 100
+            print(f"   Progress: {progress:.1f}%", end='\r')
+    
+    print()
+    return results
 
 
 def write_int(file, value, bytes_count, signed=False):
@@ -44,58 +140,83 @@ def write_int(file, value, bytes_count, signed=False):
 # BMP FILE OPERATIONS
 # ============================================================================
 
+def parse_bmp_header(data):
+    """
+    Parse and validate the BMP headers at the start of data
+    Returns: (data_offset, width, height), height is negative for top-down
+    """
+    if len(data) < BMP_HEADER_SIZE:
+        raise ValueError("Not a valid BMP file")
+    
+    # Read the file header and DIB header in one go
+    (signature, file_size, _, _, data_offset,
+     header_size, width, height, planes,
+     bits_per_pixel) = struct.unpack_from(BMP_HEADER_FORMAT, data)
+    
+    if signature != b'BM' or data_offset < BMP_HEADER_SIZE:
+        raise ValueError("Not a valid BMP file")
+    if bits_per_pixel != 24:
+        raise ValueError(f"Only 24-bit BMP supported (got {bits_per_pixel}-bit)")
+    
+    return data_offset, width, height
+
+
+def read_bmp_size(filepath):
+    """
+    Read only the headers of a BMP file
+    Returns: (width, height)
+    """
+    with open(filepath, 'rb') as f:
+        _, width, height = parse_bmp_header(f.read(BMP_HEADER_SIZE))
+    return abs(width), abs(height)
+
+
 def load_bmp_file(filepath):
     """
     Load BMP file and return header info and pixel data
-    Returns: (width, height, pixels, header_bytes)
+    Returns: (width, height, pixels, header_bytes, padding)
+    pixels is a flat bytearray of B, G, R values without row padding,
+    with rows in file order (bottom-up, or top-down if height is negative)
     """
     print(f"📂 Loading {filepath}...")
     
     with open(filepath, 'rb') as f:
-        # Read signature
-        signature = f.read(2)
-        if signature != b'BM':
+        if os.fstat(f.fileno()).st_size < BMP_HEADER_SIZE:
             raise ValueError("Not a valid BMP file")
         
-        # Read file size and data offset
-        file_size = read_int(f, 4)
-        f.read(4)  # Skip reserved bytes
-        data_offset = read_int(f, 4)
-        
-        # Read DIB header
-        header_size = read_int(f, 4)
-        width = read_int(f, 4, signed=True)
-        height = read_int(f, 4, signed=True)
-        planes = read_int(f, 2)
-        bits_per_pixel = read_int(f, 2)
-        
-        if bits_per_pixel != 24:
-            raise ValueError(f"Only 24-bit BMP supported (got {bits_per_pixel}-bit)")
-        
-        # Skip rest of header
-        f.read(24)
-        
-        # Save header for later
-        f.seek(0)
-        header_bytes = f.read(data_offset)
-        
-        # Read pixel data
-        f.seek(data_offset)
-        width = abs(width)
-        height = abs(height)
-        
-        padding = (4 - (width * 3) % 4) % 4
-        
-        pixels = []
-        for row in range(height):
-            row_pixels = []
-            for col in range(width):
-                b = read_int(f, 1)
-                g = read_int(f, 1)
-                r = read_int(f, 1)
-                row_pixels.append([b, g, r])
-            f.read(padding)  # Skip padding
-            pixels.append(row_pixels)
+        # Map the file rather than read() it, so pixel rows are copied
+        # straight from the page cache into the pixel buffer
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                memoryview(mm) as data:
+            data_offset, width, height = parse_bmp_header(data)
+            
+            # Save header for later
+            header_bytes = bytes(data[:data_offset])
+            
+            # Copy pixel data in one pass and drop the row padding.
+            # A negative height only means the rows are stored top-down;
+            # rows are kept in file order and the original header is
+            # written back on save, so the orientation is preserved.
+            width = abs(width)
+            height = abs(height)
+            
+            padding = (4 - (width * 3) % 4) % 4
+            row_size = width * 3
+            row_stride = row_size + padding
+            
+            data_end = data_offset + row_stride * height
+            if len(data) < data_end:
+                raise ValueError("BMP pixel data is truncated")
+            
+            # Flat BGR buffer, one byte per channel, rows in file order
+            if padding == 0:
+                # Rows are back to back, so take the whole block at once
+                pixels = bytearray(data[data_offset:data_end])
+            else:
+                pixels = bytearray().join(
+                    data[start:start + row_size]
+                    for start in range(data_offset, data_end, row_stride)
+                )
     
     print(f"✅ Loaded {width}x{height} BMP")
     return width, height, pixels, header_bytes, padding
@@ -109,11 +230,21 @@ def save_bmp_file(filepath, width, height, pixels, header_bytes, padding):
         # Write header
         f.write(header_bytes)
         
-        # Write pixel data
-        for row in pixels:
-            for pixel in row:
-                f.write(bytes(pixel))
-            f.write(b'\x00' * padding)
+        # Write pixel data in one call
+        if padding == 0:
+            # No gaps between rows, so the buffer is already the file layout
+            f.write(pixels)
+        else:
+            # Rebuild the padded rows in memory first
+            row_size = width * 3
+            row_padding = bytes(padding)
+            pixel_data = bytearray(row_padding).join(
+                pixels[row * row_size:(row + 1) * row_size]
+                for row in range(height)
+            )
+            if height:
+                pixel_data += row_padding  # join() only pads between rows
+            f.write(pixel_data)
     
     print(f"✅ Saved successfully!")
 
@@ -129,53 +260,45 @@ def calculate_capacity(width, height):
     return total_chars
 
 
-def encode_message_in_pixels(pixels, width, height, message):
+def embed_payload(pixels, payload, n_workers=None):
     """
-    Encode message into pixel LSBs
-    Returns: modified pixels
+    Hide payload bytes, prefixed with their length, in pixel LSBs
+    Returns: number of bits written
     """
-    # Add delimiter
-    full_message = message + DELIMITER
+    length_prefix = struct.pack(LENGTH_PREFIX_FORMAT, len(payload))
     
     # Convert to binary
-    binary_message = string_to_binary(full_message)
+    binary_message = bytes_to_bits(length_prefix + payload)
+    total_bits = len(binary_message)
     
-    print(f"🔄 Encoding {len(full_message)} characters ({len(binary_message)} bits)...")
+    if total_bits > len(pixels):
+        raise ValueError("Message is too long for this image")
     
-    bit_index = 0
-    total_bits = len(binary_message)
+    workers = get_worker_count(total_bits, n_workers)
+    if workers == 1:
+        pixels[:total_bits] = embed_bits(pixels[:total_bits], binary_message)
+    else:
+        chunks = map_chunks(embed_bits, workers,
+                            pixels[:total_bits], binary_message)
+        pixels[:total_bits] = b''.join(chunks)
     
-    # Encode bits into pixels
-    for row_idx in range(height):
-        if bit_index >= total_bits:
-            break
-            
-        for col_idx in range(width):
-            if bit_index >= total_bits:
-                break
-            
-            # Get pixel (it's a reference, so changes persist)
-            pixel = pixels[row_idx][col_idx]
-            
-            # Encode in B, G, R channels
-            for channel in range(3):
-                if bit_index >= total_bits:
-                    break
-                
-                # Get current bit
-                bit = int(binary_message[bit_index])
-                
-                # Modify LSB: clear it first, then set to message bit
-                pixel[channel] = (pixel[channel] & 0xFE) | bit
-                
-                bit_index += 1
-            
-            # Progress indicator
-            if bit_index % 1000 == 0:
-                progress = (bit_index / total_bits) * 100
-                print(f"   Progress: {progress:.1f}%", end='\r')
+    return total_bits
+
+
+def encode_message_in_pixels(pixels, width, height, message, n_workers=None):
+    """
+    Encode message into pixel LSBs
+    n_workers limits the processes used for large images (default: all CPUs)
+    Returns: modified pixels
+    """
+    message_bytes = message.encode('utf-8')
+    total_bits = (LENGTH_PREFIX_SIZE + len(message_bytes)) * BITS_PER_BYTE
     
-    print(f"\n✅ Encoded {bit_index} bits!")
+    print(f"🔄 Encoding {len(message_bytes)} characters ({total_bits} bits)...")
+    
+    embed_payload(pixels, message_bytes, n_workers)
+    
+    print(f"✅ Encoded {total_bits} bits!")
     return pixels
 
 
@@ -183,51 +306,137 @@ def encode_message_in_pixels(pixels, width, height, message):
 # DECODING FUNCTIONS
 # ============================================================================
 
-def decode_message_from_pixels(pixels, width, height):
+def extract_payload(pixels, n_workers=None):
+    """
+    Read the length-prefixed payload hidden in pixel LSBs
+    Returns: payload bytes, or None if there is no valid length prefix
+    """
+    # Read the message length first
+    prefix_bits = LENGTH_PREFIX_SIZE * BITS_PER_BYTE
+    if len(pixels) < prefix_bits:
+        return None
+    
+    length, = struct.unpack(LENGTH_PREFIX_FORMAT,
+                            bits_to_bytes(pixels[:prefix_bits]))
+    message_end = prefix_bits + length * BITS_PER_BYTE
+    if message_end > len(pixels):
+        return None
+    
+    # Collect the LSBs of just the message bytes
+    message_bits = pixels[prefix_bits:message_end]
+    workers = get_worker_count(len(message_bits), n_workers)
+    if workers == 1:
+        return bits_to_bytes(message_bits)
+    
+    # CHUNK_SIZE is a multiple of 8, so the chunks pack independently
+    return b''.join(map_chunks(bits_to_bytes, workers, message_bits))
+
+
+def decode_message_from_pixels(pixels, width, height, n_workers=None):
     """
     Extract message from pixel LSBs
+    n_workers limits the processes used for large images (default: all CPUs)
     Returns: decoded message
     """
     print(f"🔄 Extracting message...")
     
-    binary_data = []
-    max_bits = width * height * 3
+    payload = extract_payload(pixels, n_workers)
     
-    # Extract LSBs
-    for row_idx in range(height):
-        for col_idx in range(width):
-            pixel = pixels[row_idx][col_idx]
-            
-            for channel in range(3):
-                # Extract LSB
-                bit = pixel[channel] & 1
-                binary_data.append(str(bit))
-                
-                # Stop if we have enough bits (limit search)
-                if len(binary_data) >= min(max_bits, 100000):
-                    # Try to find delimiter periodically
-                    if len(binary_data) % 8000 == 0:
-                        temp_text = binary_to_string(''.join(binary_data))
-                        if DELIMITER in temp_text:
-                            # Found it! Stop reading
-                            text_result = temp_text.split(DELIMITER)[0]
-                            print(f"✅ Found message! ({len(text_result)} characters)")
-                            return text_result
-    
-    # Convert all collected bits
-    binary_string = ''.join(binary_data)
-    full_text = binary_to_string(binary_string)
-    
-    # Look for delimiter
-    if DELIMITER in full_text:
-        message = full_text.split(DELIMITER)[0]
-        print(f"✅ Extracted message! ({len(message)} characters)")
-        return message
-    else:
-        print("⚠️  Warning: Delimiter not found")
+    if payload is None:
+        print("⚠️  Warning: No hidden message found")
         # Return printable characters only
-        printable = ''.join(c for c in full_text[:500] if c.isprintable())
+        full_text = bits_to_bytes(pixels[:500 * BITS_PER_BYTE])
+        full_text = full_text.decode('utf-8', errors='replace')
+        printable = ''.join(c for c in full_text if c.isprintable())
         return printable[:200]
+    
+    message = payload.decode('utf-8', errors='replace')
+    print(f"✅ Extracted message! ({len(message)} characters)")
+    return message
+
+
+# ============================================================================
+# MULTI-IMAGE FUNCTIONS
+# ============================================================================
+
+def split_payload(payload, capacities):
+    """
+    Split payload into consecutive parts proportional to capacities
+    Returns: list of parts, one per capacity
+    """
+    total_capacity = sum(capacities)
+    if len(payload) > total_capacity:
+        raise ValueError("Message is too long for these images")
+    
+    # Part boundaries at the same fraction of the payload as of capacity;
+    # rounding down keeps every part within its image's capacity
+    bounds = [0]
+    used_capacity = 0
+    for capacity in capacities:
+        used_capacity += capacity
+        bounds.append(len(payload) * used_capacity // total_capacity
+                      if total_capacity else 0)
+    
+    return [payload[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def encode_image_file(input_path, output_path, payload):
+    """Hide payload bytes in one BMP file (worker for encode_message_in_images)"""
+    width, height, pixels, header_bytes, padding = load_bmp_file(input_path)
+    
+    # Already running in a worker process, so stay serial here
+    embed_payload(pixels, payload, n_workers=1)
+    save_bmp_file(output_path, width, height, pixels, header_bytes, padding)
+
+
+def decode_image_file(input_path):
+    """Read the payload hidden in one BMP file (worker for decode_message_from_images)"""
+    _, _, pixels, _, _ = load_bmp_file(input_path)
+    
+    payload = extract_payload(pixels, n_workers=1)
+    if payload is None:
+        raise ValueError(f"No hidden message found in {input_path}")
+    return payload
+
+
+def encode_message_in_images(input_paths, output_paths, message, n_workers=None):
+    """
+    Spread message across several BMP files in proportion to their capacity
+    input_paths[i] is saved with its part of the message as output_paths[i];
+    files are processed in up to n_workers processes (default: all CPUs)
+    """
+    if len(input_paths) != len(output_paths):
+        raise ValueError("Need one output file per input file")
+    
+    # Each image stores its own length prefix before its part
+    capacities = []
+    for path in input_paths:
+        capacity = calculate_capacity(*read_bmp_size(path)) - LENGTH_PREFIX_SIZE
+        if capacity < 0:
+            raise ValueError(f"{path} is too small to hold a message")
+        capacities.append(capacity)
+    
+    # Split the encoded bytes, not the text: a character may span two parts
+    parts = split_payload(message.encode('utf-8'), capacities)
+    
+    print(f"🔄 Encoding message across {len(input_paths)} images...")
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        list(executor.map(encode_image_file, input_paths, output_paths, parts))
+    print(f"✅ Encoded {len(input_paths)} images!")
+
+
+def decode_message_from_images(input_paths, n_workers=None):
+    """
+    Extract a message spread across BMP files by encode_message_in_images
+    input_paths must be in the same order as when encoding
+    Returns: decoded message
+    """
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        parts = list(executor.map(decode_image_file, input_paths))
+    
+    message = b''.join(parts).decode('utf-8', errors='replace')
+    print(f"✅ Extracted message! ({len(message)} characters)")
+    return message
 
 
 # ============================================================================
@@ -285,8 +494,8 @@ def encode_workflow():
             return
         
         # Check capacity
-        if len(message) + len(DELIMITER) > capacity:
-            print(f"❌ Message too long! Maximum: {capacity - len(DELIMITER)} characters")
+        if len(message.encode('utf-8')) + LENGTH_PREFIX_SIZE > capacity:
+            print(f"❌ Message too long! Maximum: {capacity - LENGTH_PREFIX_SIZE} characters")
             return
         
         # Encode